@@ -1,8 +1,10 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request
 import requests
 import os
 from datetime import datetime
 from dotenv import load_dotenv
+from email_index import search_index
+from circuit_breaker import CircuitBreaker
 
 load_dotenv()
 
@@ -13,12 +15,23 @@ LANGSMITH_API_KEY = os.getenv("LANGSMITH_API_KEY")
 LANGSMITH_ENDPOINT = os.getenv("LANGSMITH_ENDPOINT", "https://api.smith.langchain.com")
 GRAPH_ID = os.getenv("GRAPH_ID", "email_assistant_hitl_memory_gmail")  # Updated to correct graph ID
 
+# Upstream resilience: hard timeout per call, plus a breaker that fails fast during outages
+LANGSMITH_TIMEOUT = float(os.getenv("LANGSMITH_TIMEOUT", "5"))
+langsmith_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("LANGSMITH_FAILURE_THRESHOLD", "3")),
+    reset_timeout=float(os.getenv("LANGSMITH_RESET_TIMEOUT", "30")),
+    latency_budget=float(os.getenv("LANGSMITH_LATENCY_BUDGET", "2"))
+)
+
+# Last dashboard data fetched successfully, served flagged as stale while LangSmith is down
+_last_good_data = None
+
 @app.route('/')
 def index():
     """Main dashboard page"""
     try:
-        # Get data from LangSmith
-        data = get_langsmith_data()
+        # Get data from LangSmith, or the last good snapshot if it is unavailable
+        data = get_dashboard_data()
         return render_template('dashboard.html', data=data)
     except Exception as e:
         error_data = {
@@ -33,8 +46,8 @@ def index():
 def api_refresh():
     """API endpoint for dashboard refresh"""
     try:
-        data = get_langsmith_data()
-        return jsonify({"success": True, "data": data})
+        data = get_dashboard_data()
+        return jsonify({"success": True, "stale": data.get("stale", False), "data": data})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
 
@@ -43,10 +56,55 @@ def api_status():
     """API endpoint for connection status"""
     try:
         status = test_langsmith_connection()
+        status["circuit"] = langsmith_breaker.status()
         return jsonify({"success": True, "status": status})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
 
+@app.route('/api/search')
+def api_search():
+    """API endpoint for searching the local email index"""
+    try:
+        query = request.args.get('q', '')
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        results = search_index(query, page=page, per_page=per_page)
+        return jsonify({"success": True, "query": query, **results})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+
+def langsmith_get(path, headers):
+    """GET a LangSmith API path through the circuit breaker.
+
+    Timeouts, connection errors, 429 and 5xx responses count as failures; while the circuit
+    is open this raises CircuitOpenError immediately without contacting LangSmith.
+    """
+    def _get():
+        response = requests.get(f"{LANGSMITH_ENDPOINT}{path}", headers=headers, timeout=LANGSMITH_TIMEOUT)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise Exception(f"LangSmith API error: {response.status_code}")
+        return response
+
+    return langsmith_breaker.call(_get)
+
+def get_dashboard_data():
+    """Fetch live dashboard data, falling back to the last good snapshot marked stale."""
+    global _last_good_data
+    try:
+        data = get_langsmith_data()
+    except Exception as e:
+        if _last_good_data is None:
+            raise
+        return {
+            **_last_good_data,
+            "stale": True,
+            "connection_status": "stale",
+            "stale_reason": str(e),
+            "circuit": langsmith_breaker.status()
+        }
+    _last_good_data = data
+    return data
+
 def test_langsmith_connection():
     """Test connection to LangSmith"""
     if not LANGSMITH_API_KEY:
@@ -59,7 +117,7 @@ def test_langsmith_connection():
     
     try:
         # Test basic connectivity
-        response = requests.get(f"{LANGSMITH_ENDPOINT}/datasets", headers=headers)
+        response = langsmith_get("/datasets", headers)
         
         if response.status_code == 200:
             return {
@@ -102,8 +160,7 @@ def get_langsmith_data():
             raise Exception(f"LangSmith connection failed: {connection_status['message']}")
         
         # Get datasets to see what's available
-        datasets_url = f"{LANGSMITH_ENDPOINT}/datasets"
-        response = requests.get(datasets_url, headers=headers)
+        response = langsmith_get("/datasets", headers)
         
         if response.status_code == 200:
             datasets = response.json()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local email search index
+
+Builds a throwaway index of synthetic emails (1M by default) and times ranked,
+paginated searches against it, the same way /api/search queries it.
+"""
+
+import argparse
+import itertools
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from email_index import EmailIndex, search_index
+from ingest_to_langsmith import EmailRecord
+
+WORDS = (
+    "meeting project review invoice status update weekly report budget contract "
+    "schedule follow up request approval feedback launch roadmap customer support "
+    "deadline proposal agenda quarterly hiring onboarding security incident release"
+).split()
+# A long tail of rarer words so term frequencies look more like real mail
+VOCABULARY = WORDS + [f"term{i}" for i in range(5000)]
+CUM_WEIGHTS = list(itertools.accumulate([50] * len(WORDS) + [1 / (i + 1) for i in range(5000)]))
+SENDERS = [f"{name}@{domain}" for name in ("john", "jane", "billing", "product", "ops", "alex")
+           for domain in ("company.com", "vendor.com", "partner.io")]
+QUERIES = ["invoice", "meeting review", "quarterly budget", "jane", "secur*", "term42", "term4242"]
+
+def synthetic_records(count, seed=42):
+    """Yield count reproducible synthetic EmailRecords."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        yield EmailRecord(
+            id=f"msg_{i}",
+            thread_id=f"thread_{i // 4}",
+            subject=" ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=5)).capitalize(),
+            sender=rng.choice(SENDERS),
+            recipient="me@company.com",
+            date="",
+            body="",
+            snippet=" ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=20)),
+            internal_date="",
+            processed_at=(start + timedelta(seconds=i * 30)).isoformat()
+        )
+
+def time_ms(fn, repeat):
+    """Return the median wall time of fn in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local email search index.")
+    parser.add_argument('--messages', type=int, default=1_000_000, help="Emails to index (default: 1,000,000)")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed runs per query (default: 20)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "bench_index.db")
+
+        print(f"🏗️ Indexing {args.messages:,} synthetic emails...")
+        t0 = time.perf_counter()
+        with EmailIndex(path) as index:
+            index.add_many(synthetic_records(args.messages))
+            index.optimize()
+        print(f"   Built in {time.perf_counter() - t0:.1f}s")
+        print()
+
+        # Each timed search opens its own read-only connection, as /api/search does
+        print(f"🔍 Median search latency over {args.repeat} runs (20 per page, fresh connection each):")
+        for query in QUERIES + [""]:
+            for page in (1, 10):
+                ms = time_ms(lambda: search_index(query, page=page, path=path), args.repeat)
+                print(f"   {query or '<recent>':<28} page {page:<3} {ms:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
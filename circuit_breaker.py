@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker for Upstream Calls
+
+Wraps calls to an upstream service (LangSmith) so that an outage fails fast instead of
+tying up every request for the full timeout. After enough consecutive failures or
+latency-budget breaches the circuit opens; once the reset timeout passes a single
+half-open trial call decides whether to close it again.
+"""
+
+import math
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit is open."""
+
+    def __init__(self, retry_in=None):
+        # retry_in is None while a half-open trial request is deciding the circuit's fate
+        self.retry_in = retry_in
+        if retry_in is None:
+            message = "LangSmith circuit half-open; waiting on a trial request before retrying"
+        else:
+            message = f"LangSmith circuit open after repeated failures; retrying in {math.ceil(retry_in)}s"
+        super().__init__(message)
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure circuit breaker."""
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0, latency_budget=2.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_budget = latency_budget
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        # Bumped on every state transition; results from calls admitted under an
+        # earlier generation are stale and ignored
+        self._generation = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def status(self):
+        """Snapshot of the breaker for status endpoints."""
+        with self._lock:
+            return {"state": self._current_state(), "consecutive_failures": self._failures}
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker, raising CircuitOpenError instead when open."""
+        admitted = self._before_call()
+        start = self._clock()
+        success = False
+        try:
+            result = fn(*args, **kwargs)
+            # A slow success still counts against the circuit, but its result is used
+            success = self._clock() - start <= self.latency_budget
+            return result
+        finally:
+            # Runs for any exit, including interrupts, so a trial can never leave the slot held
+            self._record(admitted, success)
+
+    def _current_state(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def _transition(self, state):
+        self._state = state
+        self._generation += 1
+        if state == OPEN:
+            self._opened_at = self._clock()
+
+    def _before_call(self):
+        """Admit a call, returning (generation, is_trial), or raise CircuitOpenError."""
+        with self._lock:
+            if self._state == CLOSED:
+                return self._generation, False
+            remaining = self.reset_timeout - (self._clock() - self._opened_at)
+            if self._state == OPEN and remaining <= 0:
+                self._transition(HALF_OPEN)
+            # Only one trial request probes upstream while half-open; the rest fail fast
+            if self._state == HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError()
+                self._trial_in_flight = True
+                return self._generation, True
+            raise CircuitOpenError(remaining)
+
+    def _record(self, admitted, success):
+        generation, is_trial = admitted
+        with self._lock:
+            if generation != self._generation:
+                return
+            if is_trial:
+                # The half-open trial alone decides whether to close or reopen
+                self._trial_in_flight = False
+                self._failures = 0 if success else self._failures + 1
+                self._transition(CLOSED if success else OPEN)
+                return
+            if success:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._transition(OPEN)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Local Email Search Index
+
+A SQLite FTS5 index over ingested emails. The ingest script adds each email once it
+has been sent to LangSmith, and the dashboard searches it without calling upstream.
+"""
+
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+_ROOT = Path(__file__).parent.absolute()
+INDEX_PATH = os.getenv("EMAIL_INDEX_PATH", str(_ROOT / "email_index.db"))
+
+MAX_PER_PAGE = 100
+
+# Relevance ranking is applied to the newest RANK_WINDOW matches only, so search cost
+# stays bounded for common terms no matter how large the index grows. Every page is
+# cut from this same candidate set, so paging never reorders or repeats results.
+RANK_WINDOW = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS emails (
+    id INTEGER PRIMARY KEY,
+    email_id TEXT NOT NULL UNIQUE,
+    thread_id TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    snippet TEXT NOT NULL,
+    status TEXT NOT NULL,
+    processed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS emails_processed_at ON emails (processed_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS emails_fts USING fts5(
+    subject, sender, snippet, status, thread_id,
+    content='emails', content_rowid='id'
+);
+
+CREATE TRIGGER IF NOT EXISTS emails_ai AFTER INSERT ON emails BEGIN
+    INSERT INTO emails_fts (rowid, subject, sender, snippet, status, thread_id)
+    VALUES (new.id, new.subject, new.sender, new.snippet, new.status, new.thread_id);
+END;
+CREATE TRIGGER IF NOT EXISTS emails_ad AFTER DELETE ON emails BEGIN
+    INSERT INTO emails_fts (emails_fts, rowid, subject, sender, snippet, status, thread_id)
+    VALUES ('delete', old.id, old.subject, old.sender, old.snippet, old.status, old.thread_id);
+END;
+CREATE TRIGGER IF NOT EXISTS emails_au AFTER UPDATE ON emails BEGIN
+    INSERT INTO emails_fts (emails_fts, rowid, subject, sender, snippet, status, thread_id)
+    VALUES ('delete', old.id, old.subject, old.sender, old.snippet, old.status, old.thread_id);
+    INSERT INTO emails_fts (rowid, subject, sender, snippet, status, thread_id)
+    VALUES (new.id, new.subject, new.sender, new.snippet, new.status, new.thread_id);
+END;
+"""
+
+_UPSERT = """
+INSERT INTO emails (email_id, thread_id, subject, sender, snippet, status, processed_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (email_id) DO UPDATE SET
+    thread_id = excluded.thread_id,
+    subject = excluded.subject,
+    sender = excluded.sender,
+    snippet = excluded.snippet,
+    status = excluded.status,
+    processed_at = excluded.processed_at
+"""
+
+_COLUMNS = "e.email_id, e.thread_id, e.subject, e.sender, e.snippet, e.status, e.processed_at"
+
+def build_match_query(query):
+    """Turn free text into a safe FTS5 query in which every word must match.
+
+    A word ending in '*' matches as a prefix. Prefix terms cannot stop early in
+    FTS5, so they are only used when asked for.
+    """
+    terms = re.findall(r"\w+\*?", query)
+    if not terms:
+        return None
+    return " ".join(f'"{t[:-1]}"*' if t.endswith("*") else f'"{t}"' for t in terms)
+
+class EmailIndex:
+    """Full-text index of ingested emails backed by a single SQLite file."""
+
+    def __init__(self, path=None):
+        self.path = path or INDEX_PATH
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, record, status="received"):
+        """Insert or update one EmailRecord; call commit() to make it visible to readers.
+
+        Raises ValueError for a record that cannot be stored, e.g. a missing or non-text
+        field, leaving the index and any pending rows untouched.
+        """
+        values = (
+            record.id, record.thread_id, record.subject, record.sender,
+            record.snippet, status, record.processed_at
+        )
+        if not all(isinstance(v, str) for v in values):
+            raise ValueError(f"cannot index email {record.id!r}: every indexed field must be text")
+        try:
+            self.conn.execute(_UPSERT, values)
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"cannot index email {record.id!r}: {e}") from e
+
+    def add_many(self, records, status="received"):
+        """Insert or update an iterable of EmailRecords in one statement."""
+        self.conn.executemany(_UPSERT, (
+            (r.id, r.thread_id, r.subject, r.sender, r.snippet, status, r.processed_at)
+            for r in records
+        ))
+
+    def optimize(self):
+        """Merge the full-text index into one segment; worth doing after a large backfill."""
+        self.conn.execute("INSERT INTO emails_fts (emails_fts) VALUES ('optimize')")
+        self.conn.commit()
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def search(self, query, page=1, per_page=20):
+        """Return one page of matches; see search_connection()."""
+        return search_connection(self.conn, query, page, per_page)
+
+class EmailIndexReader:
+    """Read-only view of the index for serving searches.
+
+    Opens the file without running any schema or pragma statements, so it works on a
+    read-only filesystem such as a serverless deployment.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or INDEX_PATH
+        uri = Path(self.path).absolute().as_uri()
+        self.conn = sqlite3.connect(f"{uri}?mode=ro", uri=True)
+        try:
+            self.conn.execute("SELECT 1 FROM emails LIMIT 1")
+        except sqlite3.OperationalError:
+            self.conn.close()
+            # A WAL database needs a writable directory for its -shm file; when the
+            # directory is read-only no writer can exist, so the file is safe to treat as immutable
+            self.conn = sqlite3.connect(f"{uri}?immutable=1", uri=True)
+        self.conn.row_factory = sqlite3.Row
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def search(self, query, page=1, per_page=20):
+        """Return one page of matches; see search_connection()."""
+        return search_connection(self.conn, query, page, per_page)
+
+def search_connection(conn, query, page=1, per_page=20):
+    """Return one page of matches ranked by relevance, newest first when query is blank.
+
+    Text queries are ranked within the newest RANK_WINDOW matches only; the response
+    reports the window and whether older matches fell outside it.
+    """
+    page = max(1, page)
+    per_page = min(max(1, per_page), MAX_PER_PAGE)
+    offset = (page - 1) * per_page
+    response = {"page": page, "per_page": per_page}
+
+    # Fetch one extra row to learn whether another page exists without counting
+    match = build_match_query(query or "")
+    if match:
+        # Take one candidate past the window in the same scan to learn whether it was cut short
+        rows = conn.execute(
+            f"SELECT {_COLUMNS}, f.candidates FROM ("
+            "    SELECT rowid, score, count(*) OVER () AS candidates,"
+            "           row_number() OVER (ORDER BY rowid DESC) AS n FROM ("
+            "        SELECT rowid, bm25(emails_fts) AS score FROM emails_fts"
+            "        WHERE emails_fts MATCH ? ORDER BY rowid DESC LIMIT ?"
+            "    )"
+            ") f JOIN emails e ON e.id = f.rowid"
+            " WHERE f.n <= ? ORDER BY f.score, f.rowid DESC LIMIT ? OFFSET ?",
+            (match, RANK_WINDOW + 1, RANK_WINDOW, per_page + 1, offset)
+        ).fetchall()
+        window_truncated = bool(rows) and rows[0]["candidates"] > RANK_WINDOW
+        rows = [{k: row[k] for k in row.keys() if k != "candidates"} for row in rows]
+        response["rank_window"] = RANK_WINDOW
+        response["window_truncated"] = window_truncated
+    else:
+        rows = conn.execute(
+            f"SELECT {_COLUMNS} FROM emails e ORDER BY e.processed_at DESC LIMIT ? OFFSET ?",
+            (per_page + 1, offset)
+        ).fetchall()
+
+    response["results"] = [dict(row) for row in rows[:per_page]]
+    response["has_more"] = len(rows) > per_page
+    return response
+
+def search_index(query, page=1, per_page=20, path=None):
+    """Search the index read-only, returning an empty page if it has not been built yet."""
+    path = path or INDEX_PATH
+    if not os.path.exists(path):
+        return {
+            "page": max(1, page),
+            "per_page": min(max(1, per_page), MAX_PER_PAGE),
+            "results": [],
+            "has_more": False
+        }
+    with EmailIndexReader(path) as index:
+        return index.search(query, page=page, per_page=per_page)
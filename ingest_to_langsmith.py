@@ -6,17 +6,24 @@ This script fetches emails from Gmail and creates traces in LangSmith for proces
 It will populate the dashboard with real email data.
 """
 
+import argparse
 import base64
+import contextlib
+import gzip
 import json
 import uuid
 import hashlib
 import os
+import sqlite3
+import sys
 import requests
 from pathlib import Path
 from datetime import datetime, timedelta
+from typing import NamedTuple
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from dotenv import load_dotenv
+from email_index import EmailIndex
 
 load_dotenv()
 
@@ -31,6 +38,30 @@ LANGSMITH_API_KEY = os.getenv("LANGSMITH_API_KEY", "lsv2_sk_607eedfe1d054978bf77
 LANGSMITH_ENDPOINT = os.getenv("LANGSMITH_ENDPOINT", "https://api.smith.langchain.com")
 PROJECT_NAME = os.getenv("GRAPH_ID", "autonomous-email-inbox")
 
+# How many indexed emails to buffer before committing them to the search index
+INDEX_COMMIT_EVERY = 100
+
+# Headers pulled from each message, mapped to their fallback values
+_WANTED_HEADERS = {
+    'Subject': 'No Subject',
+    'From': 'Unknown Sender',
+    'To': 'Unknown Recipient',
+    'Date': 'Unknown Date',
+}
+
+class EmailRecord(NamedTuple):
+    """A single ingested email, used from extraction through submission and export."""
+    id: str
+    thread_id: str
+    subject: str
+    sender: str
+    recipient: str
+    date: str
+    body: str
+    snippet: str
+    internal_date: str
+    processed_at: str
+
 def extract_message_part(payload):
     """Extract content from a message part."""
     # If this is multipart, process with preference for text/plain
@@ -79,63 +110,59 @@ def get_gmail_service():
     service = build('gmail', 'v1', credentials=creds)
     return service
 
-def fetch_recent_emails(service, minutes_since=5):
-    """Fetch recent emails from Gmail."""
-    try:
-        # Calculate time threshold
-        time_threshold = datetime.now() - timedelta(minutes=minutes_since)
-        time_str = time_threshold.strftime('%Y/%m/%d %H:%M:%S')
-        
-        # Search for recent emails
-        query = f'after:{time_str}'
-        results = service.users().messages().list(userId='me', q=query).execute()
-        
-        messages = results.get('messages', [])
-        print(f"Found {len(messages)} recent emails")
-        
-        return messages
-    except Exception as e:
-        print(f"Error fetching emails: {e}")
-        return []
+def iter_recent_message_ids(service, minutes_since=5):
+    """Yield recent message stubs from Gmail one result page at a time."""
+    # Calculate time threshold
+    time_threshold = datetime.now() - timedelta(minutes=minutes_since)
+    time_str = time_threshold.strftime('%Y/%m/%d %H:%M:%S')
+    
+    # Search for recent emails, following pagination so backfills are not capped
+    query = f'after:{time_str}'
+    page_token = None
+    while True:
+        results = service.users().messages().list(
+            userId='me', q=query, pageToken=page_token
+        ).execute()
+        yield from results.get('messages', [])
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return
 
 def process_email_message(service, message_id):
-    """Process a single email message."""
+    """Process a single email message into an EmailRecord."""
     try:
         # Get full message details
         message = service.users().messages().get(userId='me', id=message_id).execute()
         
-        # Extract headers
-        headers = message['payload']['headers']
-        subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject')
-        sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown Sender')
-        recipient = next((h['value'] for h in headers if h['name'] == 'To'), 'Unknown Recipient')
-        date = next((h['value'] for h in headers if h['name'] == 'Date'), 'Unknown Date')
+        # Extract headers in a single pass
+        found = {}
+        for h in message['payload']['headers']:
+            name = h['name']
+            if name in _WANTED_HEADERS and name not in found:
+                found[name] = h['value']
         
         # Extract body
         body = extract_message_part(message['payload'])
         
-        # Create email data
-        email_data = {
-            'id': message_id,
-            'thread_id': message.get('threadId', ''),
-            'subject': subject,
-            'sender': sender,
-            'recipient': recipient,
-            'date': date,
-            'body': body[:500] + '...' if len(body) > 500 else body,  # Truncate long bodies
-            'snippet': message.get('snippet', ''),
-            'internal_date': message.get('internalDate', ''),
-            'processed_at': datetime.now().isoformat()
-        }
-        
-        return email_data
+        return EmailRecord(
+            id=message_id,
+            thread_id=message.get('threadId', ''),
+            subject=found.get('Subject', _WANTED_HEADERS['Subject']),
+            sender=found.get('From', _WANTED_HEADERS['From']),
+            recipient=found.get('To', _WANTED_HEADERS['To']),
+            date=found.get('Date', _WANTED_HEADERS['Date']),
+            body=body[:500] + '...' if len(body) > 500 else body,  # Truncate long bodies
+            snippet=message.get('snippet', ''),
+            internal_date=message.get('internalDate', ''),
+            processed_at=datetime.now().isoformat()
+        )
         
     except Exception as e:
         print(f"Error processing message {message_id}: {e}")
         return None
 
-def send_to_langsmith(email_data):
-    """Send email data to LangSmith as a trace."""
+def send_to_langsmith(record):
+    """Send an EmailRecord to LangSmith as a trace."""
     try:
         headers = {
             'Content-Type': 'application/json',
@@ -144,28 +171,28 @@ def send_to_langsmith(email_data):
         
         # Create a trace for this email
         trace_data = {
-            "name": f"Email Processing: {email_data['subject']}",
+            "name": f"Email Processing: {record.subject}",
             "project_name": PROJECT_NAME,
             "inputs": {
-                "email_subject": email_data['subject'],
-                "email_sender": email_data['sender'],
-                "email_recipient": email_data['recipient'],
-                "email_body": email_data['body'],
-                "email_snippet": email_data['snippet'],
-                "email_date": email_data['date'],
-                "email_id": email_data['id'],
-                "thread_id": email_data['thread_id']
+                "email_subject": record.subject,
+                "email_sender": record.sender,
+                "email_recipient": record.recipient,
+                "email_body": record.body,
+                "email_snippet": record.snippet,
+                "email_date": record.date,
+                "email_id": record.id,
+                "thread_id": record.thread_id
             },
             "outputs": {
                 "status": "received",
                 "processing_stage": "ingestion",
-                "timestamp": email_data['processed_at']
+                "timestamp": record.processed_at
             },
             "tags": ["email", "ingestion", "gmail"],
             "metadata": {
                 "source": "gmail",
-                "email_id": email_data['id'],
-                "thread_id": email_data['thread_id']
+                "email_id": record.id,
+                "thread_id": record.thread_id
             }
         }
         
@@ -188,38 +215,170 @@ def send_to_langsmith(email_data):
         print(f"❌ Error sending to LangSmith: {e}")
         return False
 
-def main():
+class _UnclosedStream:
+    """Context manager that yields a shared stream and flushes, but never closes, it on exit."""
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __enter__(self):
+        return self.stream
+
+    def __exit__(self, *exc):
+        self.stream.flush()
+
+def drop_index(index, error):
+    """Abandon the search index after a failure; it is a secondary copy, so ingestion carries on."""
+    print(f"⚠️ Search index update failed, continuing without it: {error}")
+    # Keep the rows already added before giving up on the index
+    try:
+        index.conn.commit()
+    except sqlite3.Error:
+        pass
+    try:
+        index.conn.close()
+    except sqlite3.Error:
+        pass
+    return None
+
+def open_export_stream(path, compress=False):
+    """Open an NDJSON export target; '-' means stdout, '.gz' paths are gzipped."""
+    compress = compress or path.endswith('.gz')
+    if path == '-':
+        if compress:
+            return gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb')
+        return _UnclosedStream(sys.stdout.buffer)
+    if compress:
+        return gzip.open(path, 'wb')
+    return open(path, 'wb')
+
+def write_ndjson_record(stream, record):
+    """Write one EmailRecord as a single NDJSON line."""
+    stream.write(json.dumps(record._asdict(), ensure_ascii=False).encode('utf-8'))
+    stream.write(b'\n')
+
+def iter_ndjson_records(path):
+    """Stream EmailRecords back from an NDJSON export, one line at a time."""
+    stream = _UnclosedStream(sys.stdin.buffer) if path == '-' else open(path, 'rb')
+    
+    with stream as f:
+        # Detect gzip from its magic bytes, since --gzip exports need not end in .gz
+        if f.peek(2)[:2] == b'\x1f\x8b':
+            f = gzip.GzipFile(fileobj=f, mode='rb')
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield EmailRecord(**json.loads(line))
+            except (ValueError, TypeError) as e:
+                print(f"⚠️ Skipping malformed record on line {line_number}: {e}")
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Ingest Gmail messages into LangSmith.")
+    parser.add_argument(
+        '--minutes', type=int, default=60,
+        help="How far back to fetch emails, in minutes (default: 60)"
+    )
+    parser.add_argument(
+        '--export', metavar='PATH',
+        help="Stream records as NDJSON to PATH ('-' for stdout) instead of sending to LangSmith"
+    )
+    parser.add_argument(
+        '--gzip', action='store_true',
+        help="Gzip the export stream (implied for paths ending in .gz)"
+    )
+    parser.add_argument(
+        '--replay', metavar='PATH',
+        help="Send records from an NDJSON export ('-' for stdin) to LangSmith instead of reading Gmail"
+    )
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main function to ingest emails."""
+    args = parse_args(argv)
+    
+    # Open the export target before redirecting logs so '-' still means the real stdout
+    export = open_export_stream(args.export, args.gzip) if args.export else contextlib.nullcontext()
+    
+    # Keep stdout clean for the NDJSON stream when exporting to it
+    log_target = sys.stderr if args.export == '-' else sys.stdout
+    with export as stream, contextlib.redirect_stdout(log_target):
+        run(args, stream)
+
+def run(args, stream=None):
+    """Run ingestion or replay, exporting to stream when one is given."""
     print("🚀 Starting LangSmith Email Ingestion...")
     print(f"📧 Project: {PROJECT_NAME}")
     print(f"🔗 Endpoint: {LANGSMITH_ENDPOINT}")
     print()
     
     try:
-        # Get Gmail service
-        service = get_gmail_service()
-        print("✅ Gmail service authenticated")
+        if args.replay:
+            records = iter_ndjson_records(args.replay)
+            print(f"♻️ Replaying records from {args.replay}")
+        else:
+            # Get Gmail service
+            service = get_gmail_service()
+            print("✅ Gmail service authenticated")
+            
+            # Stream recent emails rather than materialising the whole window
+            records = (
+                process_email_message(service, message['id'])
+                for message in iter_recent_message_ids(service, minutes_since=args.minutes)
+            )
+        
+        # Emails sent to LangSmith are also added to the local search index
+        index = None
+        if stream is None:
+            try:
+                index = EmailIndex()
+            except Exception as e:
+                print(f"⚠️ Search index unavailable, continuing without it: {e}")
         
-        # Fetch recent emails
-        messages = fetch_recent_emails(service, minutes_since=60)  # Last hour
+        processed = 0
+        successful = 0
+        try:
+            for record in records:
+                processed += 1
+                if record is None:
+                    continue
+                print(f"📨 Processing: {record.subject}")
+                if stream is not None:
+                    write_ndjson_record(stream, record)
+                    successful += 1
+                elif send_to_langsmith(record):
+                    successful += 1
+                    if index is not None:
+                        try:
+                            index.add(record)
+                            if successful % INDEX_COMMIT_EVERY == 0:
+                                index.commit()
+                        except ValueError as e:
+                            # Only this record is unindexable; keep indexing the rest
+                            print(f"⚠️ Not indexing {record.id}: {e}")
+                        except sqlite3.Error as e:
+                            index = drop_index(index, e)
+        finally:
+            if index is not None:
+                try:
+                    # Large runs leave many small index segments behind; merge them once at the end
+                    if successful >= INDEX_COMMIT_EVERY:
+                        index.optimize()
+                    index.close()
+                except sqlite3.Error as e:
+                    drop_index(index, e)
         
-        if not messages:
+        if not processed:
             print("ℹ️ No recent emails found")
             return
         
-        # Process each email
-        successful_ingests = 0
-        for message in messages:
-            email_data = process_email_message(service, message['id'])
-            if email_data:
-                print(f"📨 Processing: {email_data['subject']}")
-                if send_to_langsmith(email_data):
-                    successful_ingests += 1
-        
         print()
         print(f"🎉 Ingestion complete!")
-        print(f"📊 Processed: {len(messages)} emails")
-        print(f"✅ Successfully sent to LangSmith: {successful_ingests}")
+        print(f"📊 Processed: {processed} emails")
+        if stream is not None:
+            print(f"💾 Exported to {args.export}: {successful}")
+        else:
+            print(f"✅ Successfully sent to LangSmith: {successful}")
         
     except Exception as e:
         print(f"❌ Error during ingestion: {e}")
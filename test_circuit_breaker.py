@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Test the LangSmith Circuit Breaker
+
+Exercises the circuit breaker and the dashboard's degraded-mode serving against a fake
+LangSmith upstream with injected faults (500s, 429s, hangs and slow responses).
+No network access or API key is needed; time is driven by a fake clock.
+"""
+
+import time
+from unittest import mock
+
+import requests
+
+import app
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 30.0
+LATENCY_BUDGET = 2.0
+TIMEOUT = 5.0
+
+# Generous bound for a route that must not wait on upstream (actual times are well under 10 ms)
+FAST_ROUTE_SECONDS = 0.1
+
+class FakeClock:
+    """Monotonic clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload if payload is not None else []
+        self.text = str(self._payload)
+
+    def json(self):
+        return self._payload
+
+class FakeUpstream:
+    """Stands in for requests.get against LangSmith, with an injectable fault mode."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.mode = "ok"
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls += 1
+        if self.mode == "hang":
+            # A hung upstream costs the caller its full timeout, then raises
+            self.clock.advance(timeout)
+            raise requests.exceptions.Timeout("read timed out")
+        if self.mode == "500":
+            return FakeResponse(500)
+        if self.mode == "429":
+            return FakeResponse(429)
+        if self.mode == "slow":
+            self.clock.advance(LATENCY_BUDGET + 1)
+        return FakeResponse(200, [{
+            "id": "dataset-1",
+            "name": f"{app.GRAPH_ID}-emails",
+            "example_count": 5,
+            "created_at": "2024-01-01T00:00:00"
+        }])
+
+def make_breaker(clock):
+    return CircuitBreaker(
+        failure_threshold=FAILURE_THRESHOLD,
+        reset_timeout=RESET_TIMEOUT,
+        latency_budget=LATENCY_BUDGET,
+        clock=clock
+    )
+
+def fail():
+    raise Exception("upstream failure")
+
+def trip(breaker):
+    for _ in range(FAILURE_THRESHOLD):
+        try:
+            breaker.call(fail)
+        except Exception:
+            pass
+
+def test_opens_after_consecutive_failures():
+    """Closed -> open after FAILURE_THRESHOLD consecutive failures, not before."""
+    breaker = make_breaker(FakeClock())
+    for _ in range(FAILURE_THRESHOLD - 1):
+        try:
+            breaker.call(fail)
+        except Exception:
+            pass
+    assert breaker.state == CLOSED
+
+    # A success in between resets the count
+    breaker.call(lambda: "ok")
+    assert breaker.status()["consecutive_failures"] == 0
+
+    trip(breaker)
+    assert breaker.state == OPEN
+
+def test_fails_fast_while_open():
+    """While open, calls raise CircuitOpenError without reaching upstream."""
+    breaker = make_breaker(FakeClock())
+    trip(breaker)
+    calls = []
+    try:
+        breaker.call(lambda: calls.append(1))
+        raise AssertionError("expected CircuitOpenError")
+    except CircuitOpenError as e:
+        assert e.retry_in > 0
+    assert calls == []
+
+def test_single_half_open_trial():
+    """After the reset timeout exactly one trial is admitted; it alone decides the state."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    trip(breaker)
+    clock.advance(RESET_TIMEOUT)
+    assert breaker.status()["state"] == HALF_OPEN
+
+    concurrent = []
+    def trial():
+        # A second request arriving while the trial is in flight must fail fast
+        try:
+            breaker.call(lambda: concurrent.append("admitted"))
+        except CircuitOpenError:
+            concurrent.append("rejected")
+        raise Exception("still down")
+
+    try:
+        breaker.call(trial)
+    except Exception:
+        pass
+    assert concurrent == ["rejected"]
+    assert breaker.state == OPEN
+
+    clock.advance(RESET_TIMEOUT)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+def test_trial_in_progress_is_reported_separately():
+    """Requests turned away during a half-open trial say so instead of "retrying in 0s"."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    trip(breaker)
+    clock.advance(RESET_TIMEOUT - 0.4)
+    try:
+        breaker.call(lambda: "ok")
+        raise AssertionError("expected CircuitOpenError while open")
+    except CircuitOpenError as e:
+        assert e.retry_in > 0 and "retrying in 1s" in str(e), str(e)
+
+    clock.advance(1)
+    errors = []
+    def trial():
+        try:
+            breaker.call(lambda: "ok")
+        except CircuitOpenError as e:
+            errors.append(e)
+        return "ok"
+
+    breaker.call(trial)
+    assert errors[0].retry_in is None
+    assert "trial request" in str(errors[0]) and "0s" not in str(errors[0])
+
+def test_interrupted_trial_reopens_circuit():
+    """A trial ended by a BaseException (interrupt, worker timeout) still releases its slot."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    trip(breaker)
+    clock.advance(RESET_TIMEOUT)
+
+    def interrupted():
+        raise KeyboardInterrupt()
+
+    try:
+        breaker.call(interrupted)
+        raise AssertionError("expected KeyboardInterrupt")
+    except KeyboardInterrupt:
+        pass
+    assert breaker.state == OPEN
+
+    # Once the reset timeout passes again a fresh trial is admitted and can close the circuit
+    clock.advance(RESET_TIMEOUT)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+def test_slow_success_counts_against_budget():
+    """Successful calls slower than the latency budget still trip the circuit."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    def slow():
+        clock.advance(LATENCY_BUDGET + 0.5)
+        return "ok"
+
+    for _ in range(FAILURE_THRESHOLD):
+        assert breaker.call(slow) == "ok"
+    assert breaker.state == OPEN
+
+def test_late_success_does_not_close_open_circuit():
+    """A call admitted before the circuit opened cannot close it when it finishes."""
+    breaker = make_breaker(FakeClock())
+
+    def slow_ok():
+        trip(breaker)  # other requests fail and open the circuit meanwhile
+        return "ok"
+
+    breaker.call(slow_ok)
+    assert breaker.state == OPEN
+    assert breaker.status()["consecutive_failures"] == FAILURE_THRESHOLD
+
+def test_late_completion_does_not_free_trial_slot():
+    """A call finishing during half-open must not let a second trial through."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    late = breaker._before_call()  # admitted while closed, still in flight
+    trip(breaker)
+    clock.advance(RESET_TIMEOUT)
+    trial = breaker._before_call()
+    assert trial[1], "expected the half-open trial to be admitted"
+
+    breaker._record(late, success=True)
+    try:
+        breaker.call(lambda: "ok")
+        raise AssertionError("expected CircuitOpenError for a second trial")
+    except CircuitOpenError:
+        pass
+    assert breaker.status()["state"] == HALF_OPEN
+
+    breaker._record(trial, success=True)
+    assert breaker.state == CLOSED
+
+def check_fast(path, upstream, client):
+    """Request path and assert it neither reached upstream nor waited on it."""
+    calls = upstream.calls
+    start = time.perf_counter()
+    response = client.get(path)
+    elapsed = time.perf_counter() - start
+    assert upstream.calls == calls, f"{path} reached upstream while the circuit was open"
+    assert elapsed < FAST_ROUTE_SECONDS, f"{path} took {elapsed * 1000:.1f} ms"
+    print(f"   {path:<14} {elapsed * 1000:6.2f} ms")
+    return response
+
+def run_outage(mode, with_snapshot):
+    """Drive the Flask routes through an outage of the given fault mode."""
+    clock = FakeClock()
+    upstream = FakeUpstream(clock)
+    with mock.patch.object(app, "LANGSMITH_API_KEY", "test-key"), \
+         mock.patch.object(app, "langsmith_breaker", make_breaker(clock)), \
+         mock.patch.object(app, "_last_good_data", None), \
+         mock.patch.object(app.requests, "get", upstream.get):
+        client = app.app.test_client()
+
+        if with_snapshot:
+            warm = client.get("/api/refresh").get_json()
+            assert warm["success"] and not warm["stale"]
+
+        upstream.mode = mode
+        for _ in range(FAILURE_THRESHOLD):
+            client.get("/api/refresh")
+        assert app.langsmith_breaker.state == OPEN
+
+        refresh = check_fast("/api/refresh", upstream, client).get_json()
+        page = check_fast("/", upstream, client).get_data(as_text=True)
+        status = check_fast("/api/status", upstream, client).get_json()
+
+        assert status["status"]["status"] == "error"
+        assert status["status"]["circuit"]["state"] == OPEN
+        if with_snapshot:
+            assert refresh["success"] and refresh["stale"]
+            assert refresh["data"]["connection_status"] == "stale"
+            assert refresh["data"]["statistics"]["total_emails"] == 5
+            assert "last known data" in page
+            assert "<strong>Error:</strong>" not in page
+        else:
+            assert not refresh["success"]
+            assert "<strong>Error:</strong>" in page
+
+        # After the reset timeout a single trial probes upstream and closes the circuit
+        upstream.mode = "ok"
+        clock.advance(RESET_TIMEOUT)
+        assert app.langsmith_breaker.status()["state"] == HALF_OPEN
+        recovered = client.get("/api/refresh").get_json()
+        assert recovered["success"] and not recovered["stale"]
+        assert app.langsmith_breaker.state == CLOSED
+
+def test_routes_serve_stale_data_when_upstream_returns_500():
+    run_outage("500", with_snapshot=True)
+
+def test_routes_serve_stale_data_when_upstream_rate_limits():
+    run_outage("429", with_snapshot=True)
+
+def test_routes_serve_stale_data_when_upstream_hangs():
+    run_outage("hang", with_snapshot=True)
+
+def test_routes_serve_stale_data_when_upstream_is_slow():
+    run_outage("slow", with_snapshot=True)
+
+def test_routes_fail_fast_without_snapshot():
+    run_outage("hang", with_snapshot=False)
+
+def main():
+    """Run every check and report the results"""
+    print("🧪 LangSmith Circuit Breaker Test")
+    print("=" * 40)
+
+    tests = [(name, fn) for name, fn in globals().items() if name.startswith("test_") and callable(fn)]
+    failed = 0
+    for name, fn in tests:
+        print(f"\n▶️ {name}")
+        try:
+            fn()
+            print("✅ Passed")
+        except Exception as e:
+            failed += 1
+            print(f"❌ Failed: {e!r}")
+
+    print()
+    if failed:
+        print(f"❌ {failed} of {len(tests)} checks failed")
+        raise SystemExit(1)
+    print(f"🎉 All {len(tests)} checks passed!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Test the Local Email Search Index
+
+Checks indexing, ranked and paginated search, query sanitisation, the read-only
+/api/search endpoint and the ingest script's incremental indexing, all against
+temporary SQLite files. No network access or API key is needed.
+"""
+
+import io
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import app
+import email_index
+import ingest_to_langsmith as ingest
+from email_index import EmailIndex, search_index
+
+def make_record(i, subject=None, snippet="", sender="sender@example.com"):
+    return ingest.EmailRecord(
+        id=f"msg_{i}",
+        thread_id=f"thread_{i // 2}",
+        subject=subject if subject is not None else f"Message {i}",
+        sender=sender,
+        recipient="me@example.com",
+        date="",
+        body="",
+        snippet=snippet,
+        internal_date="",
+        processed_at=f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}"
+    )
+
+def build_index(tmp, records):
+    path = os.path.join(tmp, "index.db")
+    with EmailIndex(path) as index:
+        for record in records:
+            index.add(record)
+    return path
+
+def all_pages(query, path, per_page):
+    """Collect every page of a search, returning (ids, last response)."""
+    ids, page = [], 1
+    while True:
+        response = search_index(query, page=page, per_page=per_page, path=path)
+        ids += [r["email_id"] for r in response["results"]]
+        if not response["has_more"]:
+            return ids, response
+        page += 1
+
+def test_upsert_and_match():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_index(tmp, [
+            make_record(1, "Quarterly invoice", "please pay"),
+            make_record(2, "Team lunch", "pizza on friday"),
+            make_record(3, "Re: lunch", "invoice attached", sender="billing@vendor.com"),
+        ])
+
+        ids = [r["email_id"] for r in search_index("invoice", path=path)["results"]]
+        assert sorted(ids) == ["msg_1", "msg_3"]
+        assert [r["email_id"] for r in search_index("billing", path=path)["results"]] == ["msg_3"]
+        ids = [r["email_id"] for r in search_index("thread_1", path=path)["results"]]
+        assert sorted(ids) == ["msg_2", "msg_3"]
+
+        # Re-adding an email updates it in place rather than duplicating it
+        with EmailIndex(path) as index:
+            index.add(make_record(1, "Quarterly report", "nothing to pay"))
+            index.add(make_record(2, "Team lunch"), status="processed")
+        ids = [r["email_id"] for r in search_index("invoice", path=path)["results"]]
+        assert ids == ["msg_3"]
+        assert [r["status"] for r in search_index("processed", path=path)["results"]] == ["processed"]
+        assert len(search_index("", path=path)["results"]) == 3
+
+        # A blank query lists the newest emails first
+        assert [r["email_id"] for r in search_index("", path=path)["results"]] == ["msg_3", "msg_2", "msg_1"]
+
+def test_pagination_is_stable_across_rank_window():
+    window = 10
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(email_index, "RANK_WINDOW", window):
+        # Older emails mention the term more often, so they would outrank newer ones
+        records = [make_record(i, "alpha " * (30 - i), "filler") for i in range(25)]
+        path = build_index(tmp, records)
+
+        ids, last = all_pages("alpha", path, per_page=3)
+        assert len(ids) == window
+        assert len(set(ids)) == window
+        assert set(ids) == {f"msg_{i}" for i in range(15, 25)}, "window must be the newest matches"
+        assert last["rank_window"] == window
+        assert last["window_truncated"] is True
+
+        first = search_index("alpha", page=1, per_page=3, path=path)
+        assert first["has_more"] is True
+        assert first["window_truncated"] is True
+
+        # Exactly window matches: everything fits and nothing is reported as cut off
+        path = os.path.join(tmp, "exact.db")
+        with EmailIndex(path) as index:
+            for record in records[:window]:
+                index.add(record)
+        ids, last = all_pages("alpha", path, per_page=4)
+        assert sorted(ids) == sorted(f"msg_{i}" for i in range(window))
+        assert last["window_truncated"] is False
+        assert last["has_more"] is False
+
+def test_query_sanitisation():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_index(tmp, [
+            make_record(1, "Security review", "near the deadline"),
+            make_record(2, "Secret santa"),
+        ])
+
+        assert email_index.build_match_query('say "hi" NEAR(a b) -c') == '"say" "hi" "NEAR" "a" "b" "c"'
+        assert email_index.build_match_query('"(*)') is None
+
+        for query in ['"', '""', 'NEAR(', 'NEAR(security', 'security"', '*', 'a OR', '(', "'; DROP TABLE emails; --"]:
+            response = search_index(query, path=path)
+            assert isinstance(response["results"], list), query
+
+        # Operators are searched as plain words rather than interpreted
+        assert [r["email_id"] for r in search_index("NEAR(", path=path)["results"]] == ["msg_1"]
+        assert search_index("secur", path=path)["results"] == []
+        ids = [r["email_id"] for r in search_index("sec*", path=path)["results"]]
+        assert sorted(ids) == ["msg_1", "msg_2"]
+
+def test_missing_index_returns_empty_page():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "missing.db")
+        response = search_index("anything", page=2, per_page=500, path=path)
+        assert response == {"page": 2, "per_page": email_index.MAX_PER_PAGE, "results": [], "has_more": False}
+        assert not os.path.exists(path), "searching must not create the index"
+
+def test_api_search_endpoint():
+    client = app.app.test_client()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = build_index(tmp, [make_record(i, f"Invoice {i}") for i in range(5)])
+        with mock.patch.object(email_index, "INDEX_PATH", path):
+            response = client.get("/api/search?q=invoice&per_page=2&page=2").get_json()
+            assert response["success"] is True
+            assert response["query"] == "invoice"
+            assert response["page"] == 2 and response["per_page"] == 2
+            assert len(response["results"]) == 2 and response["has_more"] is True
+            assert response["window_truncated"] is False
+
+            # The read-only path must not write anything next to the index
+            before = sorted(os.listdir(tmp))
+            client.get("/api/search?q=invoice")
+            assert sorted(os.listdir(tmp)) == before
+
+        with mock.patch.object(email_index, "INDEX_PATH", os.path.join(tmp, "missing.db")):
+            response = client.get("/api/search?q=invoice").get_json()
+            assert response["success"] is True and response["results"] == []
+
+def test_ingest_skips_unindexable_record_only():
+    """A bad record is skipped without losing the rows indexed before or after it."""
+    records = [make_record(i) for i in range(5)]
+    records[3] = records[3]._replace(subject=None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.db")
+        replay = os.path.join(tmp, "replay.ndjson")
+        with open(replay, "wb") as f:
+            for record in records:
+                ingest.write_ndjson_record(f, record)
+
+        sent = []
+        log = io.StringIO()
+        with mock.patch.object(ingest, "send_to_langsmith", lambda r: sent.append(r) or True), \
+             mock.patch.object(ingest, "EmailIndex", lambda: EmailIndex(path)), \
+             mock.patch.object(sys, "stdout", log):
+            ingest.main(["--replay", replay])
+
+        assert len(sent) == 5
+        assert "Not indexing msg_3" in log.getvalue()
+        ids = [r["email_id"] for r in search_index("", path=path)["results"]]
+        assert sorted(ids) == ["msg_0", "msg_1", "msg_2", "msg_4"]
+
+def test_ingest_keeps_pending_rows_when_index_fails():
+    """If the index itself fails, rows added before the failure are still committed."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.db")
+        replay = os.path.join(tmp, "replay.ndjson")
+        with open(replay, "wb") as f:
+            for i in range(5):
+                ingest.write_ndjson_record(f, make_record(i))
+
+        real_add = EmailIndex.add
+        def flaky_add(self, record, status="received"):
+            if record.id == "msg_3":
+                raise email_index.sqlite3.OperationalError("database is locked")
+            real_add(self, record, status)
+
+        sent = []
+        with mock.patch.object(ingest, "send_to_langsmith", lambda r: sent.append(r) or True), \
+             mock.patch.object(ingest, "EmailIndex", lambda: EmailIndex(path)), \
+             mock.patch.object(EmailIndex, "add", flaky_add), \
+             mock.patch.object(sys, "stdout", io.StringIO()):
+            ingest.main(["--replay", replay])
+
+        assert len(sent) == 5
+        ids = [r["email_id"] for r in search_index("", path=path)["results"]]
+        assert sorted(ids) == ["msg_0", "msg_1", "msg_2"]
+
+def main():
+    """Run every check and report the results"""
+    print("🧪 Email Search Index Test")
+    print("=" * 40)
+
+    tests = [(name, fn) for name, fn in globals().items() if name.startswith("test_") and callable(fn)]
+    failed = 0
+    for name, fn in tests:
+        print(f"\n▶️ {name}")
+        try:
+            fn()
+            print("✅ Passed")
+        except Exception as e:
+            failed += 1
+            print(f"❌ Failed: {e!r}")
+
+    print()
+    if failed:
+        print(f"❌ {failed} of {len(tests)} checks failed")
+        raise SystemExit(1)
+    print(f"🎉 All {len(tests)} checks passed!")
+
+if __name__ == "__main__":
+    main()
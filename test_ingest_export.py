@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test NDJSON Export and Replay
+
+Runs the ingest script's --export and --replay modes against a fake Gmail service and
+a stubbed LangSmith sender, checking that records round-trip (plain and gzip), that a
+stdout export carries only NDJSON, and that malformed lines are skipped.
+No network access, Gmail credentials or API key is needed.
+"""
+
+import base64
+import io
+import json
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import ingest_to_langsmith as ingest
+from email_index import EmailIndex
+
+MESSAGE_COUNT = 5
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+class FakeGmail:
+    """Minimal stand-in for the Gmail API client, serving two pages of messages."""
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId, q, pageToken=None):
+        start = int(pageToken or 0)
+        end = min(start + 3, MESSAGE_COUNT)
+        page = {"messages": [{"id": f"msg_{i}"} for i in range(start, end)]}
+        if end < MESSAGE_COUNT:
+            page["nextPageToken"] = str(end)
+        return FakeRequest(page)
+
+    def get(self, userId, id):
+        body = base64.urlsafe_b64encode(f"Body of {id} – ünïcode".encode("utf-8")).decode()
+        return FakeRequest({
+            "threadId": f"thread_{id}",
+            "snippet": f"Snippet of {id}",
+            "internalDate": "1700000000000",
+            "payload": {
+                "headers": [
+                    {"name": "Subject", "value": f"Subject {id}"},
+                    {"name": "From", "value": "sender@example.com"},
+                ],
+                "body": {"data": body}
+            }
+        })
+
+def run_main(argv, tmp):
+    """Run the ingest script with Gmail faked, LangSmith stubbed and the index in tmp."""
+    sent = []
+    def fake_send(record):
+        sent.append(record)
+        return True
+
+    index_path = os.path.join(tmp, "index.db")
+    with mock.patch.object(ingest, "get_gmail_service", FakeGmail), \
+         mock.patch.object(ingest, "send_to_langsmith", fake_send), \
+         mock.patch.object(ingest, "EmailIndex", lambda: EmailIndex(index_path)):
+        ingest.main(argv)
+    return sent
+
+def check_round_trip(file_name, extra_args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, file_name)
+        assert run_main(["--export", path] + extra_args, tmp) == []
+
+        with open(path, "rb") as f:
+            compressed = f.read(2) == b"\x1f\x8b"
+        assert compressed == ("--gzip" in extra_args or file_name.endswith(".gz"))
+
+        replayed = run_main(["--replay", path], tmp)
+        assert len(replayed) == MESSAGE_COUNT
+        assert [r.id for r in replayed] == [f"msg_{i}" for i in range(MESSAGE_COUNT)]
+        assert all(isinstance(r, ingest.EmailRecord) for r in replayed)
+        assert replayed[0].subject == "Subject msg_0"
+        assert replayed[0].recipient == "Unknown Recipient"
+        assert replayed[0].body.endswith("ünïcode")
+
+def test_plain_round_trip():
+    check_round_trip("export.ndjson", [])
+
+def test_gzip_round_trip_by_flag():
+    """--gzip output replays even though the file name does not end in .gz."""
+    check_round_trip("export.ndjson", ["--gzip"])
+
+def test_gzip_round_trip_by_extension():
+    check_round_trip("export.ndjson.gz", [])
+
+def test_stdout_export_keeps_logs_off_stdout():
+    stdout = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+    stderr = io.StringIO()
+    with tempfile.TemporaryDirectory() as tmp, \
+         mock.patch.object(sys, "stdout", stdout), \
+         mock.patch.object(sys, "stderr", stderr):
+        run_main(["--export", "-"], tmp)
+
+    lines = stdout.buffer.getvalue().decode("utf-8").splitlines()
+    assert len(lines) == MESSAGE_COUNT
+    assert [json.loads(line)["id"] for line in lines] == [f"msg_{i}" for i in range(MESSAGE_COUNT)]
+    assert "Starting LangSmith Email Ingestion" in stderr.getvalue()
+    assert "Exported to -" in stderr.getvalue()
+
+def test_malformed_lines_are_skipped():
+    good = ingest.EmailRecord(
+        id="msg_ok", thread_id="t", subject="s", sender="a@b", recipient="c@d",
+        date="", body="", snippet="", internal_date="", processed_at="2024-01-01T00:00:00"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "mixed.ndjson")
+        with open(path, "wb") as f:
+            f.write(b"not json\n")
+            ingest.write_ndjson_record(f, good)
+            f.write(b'{"id": "missing_fields"}\n')
+            f.write(b"\n")
+            f.write(b"[1, 2]\n")
+            f.write(json.dumps({**good._asdict(), "unexpected": 1}).encode() + b"\n")
+            ingest.write_ndjson_record(f, good._replace(id="msg_ok_2"))
+
+        log = io.StringIO()
+        with mock.patch.object(sys, "stdout", log):
+            records = list(ingest.iter_ndjson_records(path))
+
+    assert [r.id for r in records] == ["msg_ok", "msg_ok_2"]
+    for line_number in (1, 3, 5, 6):
+        assert f"line {line_number}:" in log.getvalue()
+
+def main():
+    """Run every check and report the results"""
+    print("🧪 NDJSON Export and Replay Test")
+    print("=" * 40)
+
+    tests = [(name, fn) for name, fn in globals().items() if name.startswith("test_") and callable(fn)]
+    failed = 0
+    for name, fn in tests:
+        print(f"\n▶️ {name}")
+        try:
+            fn()
+            print("✅ Passed")
+        except Exception as e:
+            failed += 1
+            print(f"❌ Failed: {e!r}")
+
+    print()
+    if failed:
+        print(f"❌ {failed} of {len(tests)} checks failed")
+        raise SystemExit(1)
+    print(f"🎉 All {len(tests)} checks passed!")
+
+if __name__ == "__main__":
+    main()